@@ -1,3 +1,5 @@
+import sys
+from functools import partial
 from recursive_cache import recursive_cache
 
 @recursive_cache
@@ -33,6 +35,36 @@ def func2(m, n):
 def func3(m, n):
     return func2(m, n-1)
 
+def power(base, n):
+    return base ** n
+
+# Testing if it can cache callables which are not functions.
+square = recursive_cache(partial(power, n=2))
+
+class Triangle:
+    """Testing if it can cache callable instances."""
+    def __call__(self, n):
+        return n if n < 1 else n + triangle(n-1)
+
+triangle = recursive_cache(Triangle())
+
+@recursive_cache
+def identity(n):
+    """Testing if it can be called close to the recursion limit."""
+    return n
+
+def near_limit(frames, n):
+    """Test helper which calls identity(n) after the given amount of frames."""
+    return identity(n) if frames <= 0 else near_limit(frames-1, n)
+
+for frames in range(sys.getrecursionlimit() - 20, sys.getrecursionlimit()):
+    try:
+        near_limit(frames, frames)
+    except RecursionError:
+        pass
+
+print(square(12))
+print(triangle(3000))
 print(fib(3000))
 print(foo(3000))
 print(func1(3000))
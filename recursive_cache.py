@@ -1,9 +1,11 @@
 from __future__ import annotations
+import inspect
+import linecache
 import sys
-from typing import overload, Any, Callable, Dict, Hashable, Iterable, Iterator, Mapping, NoReturn, Sequence, Tuple, TypeVar
-from types import TracebackType
-from functools import wraps
-from itertools import groupby
+import threading
+from typing import overload, Any, Callable, Dict, Hashable, Iterable, Iterator, Mapping, NamedTuple, NoReturn, Sequence, Tuple, TypeVar, Union
+from types import CodeType, FunctionType, TracebackType
+from functools import lru_cache, wraps
 
 E = TypeVar("E", bound=Exception)
 S = TypeVar("S", bound=Hashable)
@@ -52,31 +54,66 @@ class InfoException(Exception):
     def __init__(self, msg: str = toggle_message, *args):
         super().__init__(msg, *args)
 
-# True if this is the main call, False if this is a recursive call.
-_base_call = True
+class _UnwindToTrampoline(BaseException):
+    """
+    Used to unwind the call stack back to the base call before reaching the recursion limit.
+
+    Subclasses BaseException so that it is not caught by the decorated functions.
+    """
+
+class _LocalState(threading.local):
+    """Stores the calls that are currently being evaluated, separately for each thread."""
+
+    def __init__(self) -> None:
+        # True if this is the main call, False if this is a recursive call.
+        self.base_call = True
+        # The amount of nested wrapper calls from the base call.
+        self.depth = 0
+        # The amount of nested wrapper calls allowed before unwinding back to the base call.
+        self.max_depth = 0
+        # Raised to unwind back to the base call, reused to avoid creating new exceptions.
+        self.unwind = _UnwindToTrampoline()
+        # Store calls that are currently being evaluated in the form:
+        # temp_cache[func_id, args, kwargs] = kwargs dict or None
+        self.temp_cache = dict()
+        # Store the keys of temp_cache in the order they were added,
+        # with the latest call that needs evaluating at the end.
+        self.temp_stack = list()
+
+    def temp_remove(self, key: Tuple[int, KeyType]) -> None:
+        """Removes a call from the temp_cache and the temp_stack."""
+        del self.temp_cache[key]
+        # The removed call is almost always the latest call.
+        if self.temp_stack[-1] == key:
+            self.temp_stack.pop()
+        else:
+            self.temp_stack.remove(key)
+
+    def temp_clear(self) -> None:
+        """Removes every call from the temp_cache and the temp_stack."""
+        self.temp_cache.clear()
+        self.temp_stack.clear()
+
 # Store cached functions in the form:
-# func_cache[func_id] = (func, cache)
-_func_cache = list()
-# Store calls that are currently being evaluated in the form:
-# temp_cache[func_id, args, kwargs] = None
-_temp_cache = dict()
+# func_cache[id(func)] = (func, cache)
+_func_cache = dict()
+# Store the state of the current thread.
+_local = _LocalState()
 
 def identity(x: T) -> T:
     return x
 
+def traceback_fingerprint(tb: TracebackType) -> Tuple[CodeType, int, int]:
+    """Returns what is compared to check if two tracebacks are equal."""
+    return (tb.tb_frame.f_code, tb.tb_lineno, tb.tb_lasti)
+
 def equal_tracebacks(tb1: TracebackType, tb2: TracebackType) -> bool:
-    """Compares two tracebacks."""
-    return (
-        tb1.tb_lasti == tb2.tb_lasti
-        and tb1.tb_lineno == tb2.tb_lineno
-        and all(
-            getattr(tb1.tb_frame, f_attr) == getattr(tb2.tb_frame, f_attr)
-            for f_attr in dir(tb1.tb_frame)
-            if f_attr.startswith("f_")
-            if f_attr not in {"f_back", "f_locals"}
-        )
-    )
+    """
+    Compares two tracebacks.
 
+    Tracebacks are equal if they are at the same position in the same code.
+    """
+    return traceback_fingerprint(tb1) == traceback_fingerprint(tb2)
 
 def traceback_iter(tb: TracebackType) -> Iterator[TracebackType]:
     """Loops through the traceback, starting from source to most recent call."""
@@ -86,13 +123,14 @@ def traceback_iter(tb: TracebackType) -> Iterator[TracebackType]:
 
 def traceback_join(tbs: Iterable[TracebackType]) -> TracebackType:
     """Merges the traceback back together, starting from source to most recent call."""
-    it = iter(tbs)
-    root_tb = curr_tb = next(it, None)
-    for tb in it:
-        curr_tb.tb_next = tb
-        curr_tb = tb
-    curr_tb.tb_next = None
-    return root_tb
+    tbs = list(tbs)
+    # Setting tb_next walks through the new tb_next to check for loops,
+    # so detach every traceback first to avoid walking through the rest of the traceback.
+    for tb in tbs:
+        tb.tb_next = None
+    for tb1, tb2 in zip(tbs, tbs[1:]):
+        tb1.tb_next = tb2
+    return tbs[0] if tbs else None
 
 def strip_traceback(e: E) -> E:
     """
@@ -104,41 +142,45 @@ def strip_traceback(e: E) -> E:
     e.with_traceback(traceback_join(
         tb
         for tb in traceback_iter(e.__traceback__)
-        if tb.tb_frame.f_code.co_filename != __spec__.origin
+        if id(tb.tb_frame.f_code) not in _module_codes
     ))
     tracebacks = list(traceback_iter(e.__traceback__))
+    # Fingerprint the tracebacks so that they can be compared quickly.
+    fingerprints = [traceback_fingerprint(tb) for tb in tracebacks]
+    # Find the previous index of each fingerprint in one pass.
+    seen = dict()
+    previous = []
+    for i, fingerprint in enumerate(fingerprints):
+        previous.append(seen.get(fingerprint))
+        seen[fingerprint] = i
+    # Only check each length of cycle once.
+    checked_lengths = set()
     # Detect cycles in the traceback starting from the middle.
     for index in range(len(tracebacks) // 2, len(tracebacks) * 3 // 4):
-        pointer = tracebacks[index]
-        # Find the length of the cycle, assuming the next match is a cycle.
-        cycle_start = next(
-            (
-                i
-                for i in reversed(range(index))
-                if equal_tracebacks(tracebacks[i], pointer)
-            ),
-            None,
-        )
-        # Cycle possibly exists.
-        if cycle_start is not None:
-            cycle = tracebacks[cycle_start:index]
-            # Find all cycles.
+        # Find the length of the cycle, assuming the previous match is a cycle.
+        cycle_start = previous[index]
+        # Cycle possibly exists and is long enough to be pulled out.
+        if cycle_start is not None and index - cycle_start > 1 and index - cycle_start not in checked_lengths:
+            checked_lengths.add(index - cycle_start)
+            cycle = fingerprints[cycle_start:index]
+            # Find all cycles, including a partial cycle at the end.
             cycles = [
                 i
                 for i in range(len(tracebacks))
-                if all(
-                    equal_tracebacks(tb1, tb2)
-                    for tb1, tb2 in zip(tracebacks[i:i+len(cycle)], cycle)
-                )
+                if fingerprints[i:i+len(cycle)] == cycle[:len(tracebacks)-i]
             ]
             # Find the contiguous groups of cycles.
-            subcycles = (cyc - len(cycle) * i for i, cyc in enumerate(cycles))
-            grouped_cycles = [list(group) for _, group in groupby(cycles, lambda _: next(subcycles))]
+            grouped_cycles = [[cycles[0]]]
+            for cyc in cycles[1:]:
+                if cyc - grouped_cycles[-1][-1] == len(cycle):
+                    grouped_cycles[-1].append(cyc)
+                else:
+                    grouped_cycles.append([cyc])
             cause = None
             # Delete from the traceback in reversed order.
             for group in reversed(grouped_cycles):
                 # Only pull out groups that are sufficiently long.
-                if len(cycle) > 1 and len(group) > 3:
+                if len(group) > 3:
                     # Pull out the source of the exception that was called by the recursion.
                     if group[-1] + len(cycle) < len(tracebacks):
                         next_cause = InfoException(
@@ -171,138 +213,361 @@ def strip_traceback(e: E) -> E:
     # Use the new tracebacks.
     return e.with_traceback(traceback_join(tracebacks))
 
+# Common Hashable types which can be cached as is without checking the other cases.
+_FAST_HASHABLE = frozenset({int, str, bytes, float, bool, type(None), tuple, frozenset, complex})
+
+class Wrapped(NamedTuple):
+    """
+    Marks a cached object which must be unhashed with unhash(value) before being returned.
+
+    Cached objects which are not Wrapped are returned as they are.
+    Custom hashify functions used with the default unhashify should
+    store Wrapped(unhash, value) for anything that needs unhashing.
+    """
+    unhash: Callable[[Any], Any]
+    value: Any
+
+def clear_frames(e: E) -> E:
+    """
+    Clears the local variables of the frames an exception passed through
+    while the latest unfinished call was being re-called, so that caching it
+    does not keep every local variable of the recursion alive.
+
+    The traceback starts from the frame re-calling it, so the frames being
+    cleared start from the next traceback. Chained exceptions and frames
+    from outside of the call are left alone.
+
+    The traceback itself is kept for displaying where the exception came from.
+    """
+    tb = e.__traceback__.tb_next
+    # Anything after a cached exception was re-raised has already been cleared.
+    while tb is not None and tb.tb_frame.f_code is not raise_exception.__code__:
+        # Frames which are still running can't be cleared.
+        try:
+            tb.tb_frame.clear()
+        except RuntimeError:
+            pass
+        tb = tb.tb_next
+    return e
+
 def raise_exception(e: Exception) -> NoReturn:
     """Re-raise an exception."""
     raise e
 
-def hashify(obj: T, cache: Dict[KeyType, T], key: KeyType) -> Tuple[Callable[[S], T], S]:
+def hashify(obj: T, cache: Dict[KeyType, T], key: KeyType) -> Union[S, Wrapped]:
     """
     Store a shallow hashable copy of an object into the cache with the given key.
 
+    Objects which need to be unhashed are stored as Wrapped(unhash, value),
+    while anything else is stored as it is and returned as it is by unhashify.
+
     Cases:
     - Use type(obj).copy(obj) if type(obj) has a copy method.
     - Hash Exception as obj itself. Unhash by raising obj.
-    - Hash Hashable as obj itself.
+    - Hash Iterator as obj. Unhash as iter(obj).
+    - Hash Hashable as obj itself, unwrapped.
     - Hash set as frozenset.
     - Hash Mapping as tuple(obj.items()). Unhash as dict(tuple).
-    - Hash Iterator as obj. Unhash as iter(obj).
-    - Hash Iterable or Sequence as tuple(obj). Unhash as tuple.
-    - Otherwise just use the given object.
+    - Hash Iterable or Sequence as tuple(obj), unwrapped.
+    - Otherwise just use the given object, unwrapped.
     """
-    if hasattr(type(obj), "copy"):
-        cache[key] = (type(obj).copy, obj)
+    if type(obj) in _FAST_HASHABLE:
+        cache[key] = obj
+    elif hasattr(type(obj), "copy"):
+        cache[key] = Wrapped(type(obj).copy, obj)
     elif isinstance(obj, Exception):
-        cache[key] = (raise_exception, obj)
+        cache[key] = Wrapped(raise_exception, obj)
+    elif isinstance(obj, Iterator):
+        cache[key] = Wrapped(iter, obj)
     elif isinstance(obj, Hashable):
-        cache[key] = (identity, obj)
+        cache[key] = obj
     elif isinstance(obj, set):
-        cache[key] = (set, frozenset(obj))
+        cache[key] = Wrapped(set, frozenset(obj))
     elif isinstance(obj, Mapping):
-        cache[key] = (dict, tuple(obj.items()))
-    elif isinstance(obj, Iterator):
-        cache[key] = (iter, obj)
+        cache[key] = Wrapped(dict, tuple(obj.items()))
     elif isinstance(obj, (Iterable, Sequence)):
-        cache[key] = (identity, tuple(obj))
+        cache[key] = tuple(obj)
     else:
-        cache[key] = (identity, obj)
+        cache[key] = obj
     return cache[key]
 
-def unhashify(obj: Tuple[Callable[[S], T], S], cache: Dict[KeyType, T], key: KeyType) -> T:
+def unhashify(obj: Union[S, Wrapped], cache: Dict[KeyType, T], key: KeyType) -> T:
     """
     Return an unhashed object.
 
-    If obj[1] is an Exception or Iterator, it is removed from the cache.
+    Wrapped(unhash, value) is unhashed as unhash(value),
+    while anything else is returned as it is.
+
+    If obj wraps an Exception or Iterator, it is removed from the cache.
+    """
+    if type(obj) is not Wrapped:
+        return obj
+    elif isinstance(obj.value, (Exception, Iterator)):
+        return obj.unhash(cache.pop(key).value)
+    return obj.unhash(obj.value)
+
+# Used to check if the default hashify and unhashify are being used.
+_hashify = hashify
+_unhashify = unhashify
+# Used to check if a key is not in a cache.
+_MISSING = object()
+
+# Source for a wrapper with the same parameters as the cached function.
+# The names used are prefixed to avoid conflicts with the parameters.
+specialized_source = """
+def __make_wrapper(__cache_get, __missing, __type, __wrapped, __generic, __module):
+    def wrapper({parameters}):
+        __cached = __cache_get(({arguments}, ()), __missing)
+        if __cached is not __missing and __type(__cached) is not __wrapped:
+            return __cached
+        try:
+            return __generic{arguments}
+        except Exception as __exception:
+            # Strip this and the general wrapper from the traceback except for the last raise.
+            # The general wrapper may not be in the traceback if it could not be called.
+            if __module.STRIP_TRACEBACK:
+                __traceback = __exception.__traceback__.tb_next
+                if __traceback is not None and __traceback.tb_next is not None:
+                    __traceback = __traceback.tb_next
+                __exception.__traceback__ = __traceback
+            raise __exception
+    return wrapper
+"""
+
+# Source for a wrapper of a cached function with only one parameter.
+# Unwrapped finished calls are additionally stored by the only argument,
+# which avoids building the key when they are called again.
+specialized_single_source = """
+def __make_wrapper(__cache_get, __missing, __type, __wrapped, __generic, __module):
+    __argument_cache = {{}}
+    __argument_cache_get = __argument_cache.get
+    def wrapper({parameters}):
+        __cached = __argument_cache_get({argument}, __missing)
+        if __cached is not __missing:
+            return __cached
+        __cached = __cache_get((({argument},), ()), __missing)
+        if __cached is not __missing and __type(__cached) is not __wrapped:
+            __argument_cache[{argument}] = __cached
+            return __cached
+        try:
+            return __generic({argument})
+        except Exception as __exception:
+            # Strip this and the general wrapper from the traceback except for the last raise.
+            # The general wrapper may not be in the traceback if it could not be called.
+            if __module.STRIP_TRACEBACK:
+                __traceback = __exception.__traceback__.tb_next
+                if __traceback is not None and __traceback.tb_next is not None:
+                    __traceback = __traceback.tb_next
+                __exception.__traceback__ = __traceback
+            raise __exception
+    return wrapper
+"""
+
+def specialize_wrapper(func: Callable[..., T], cache: Dict[KeyType, Any], wrapper: Callable[..., T]) -> Callable[..., T]:
     """
-    if isinstance(obj[1], (Exception, Iterator)):
-        return obj[0](cache.pop(key)[1])
-    return obj[0](obj[1])
+    Generates a wrapper with the same parameters as func which returns
+    unwrapped finished calls and otherwise calls the given wrapper.
+
+    Only functions with positional parameters and no defaults are specialized,
+    otherwise the given wrapper is returned.
+    """
+    # Other callables, such as partials and instances, may have different attributes.
+    if not isinstance(func, FunctionType):
+        return wrapper
+    try:
+        parameters = list(inspect.signature(func, follow_wrapped=False).parameters.values())
+    except (TypeError, ValueError):
+        return wrapper
+    if any(
+        parameter.kind not in (parameter.POSITIONAL_ONLY, parameter.POSITIONAL_OR_KEYWORD)
+        or parameter.default is not parameter.empty
+        or parameter.name.startswith("__")
+        for parameter in parameters
+    ):
+        return wrapper
+    names = [parameter.name for parameter in parameters]
+    # Mark positional only parameters.
+    if any(parameter.kind is parameter.POSITIONAL_ONLY for parameter in parameters):
+        index = 1 + max(
+            i
+            for i, parameter in enumerate(parameters)
+            if parameter.kind is parameter.POSITIONAL_ONLY
+        )
+        names.insert(index, "/")
+    arguments = "".join(f"{parameter.name}, " for parameter in parameters)
+    source = specialized_single_source if len(parameters) == 1 else specialized_source
+    formatted = source.format(parameters=", ".join(names), arguments=f"({arguments})", argument=names[0] if names else "")
+    # Register the source under a unique filename so that it shows up in the traceback.
+    filename = f"<{__name__} wrapper of {func.__qualname__} at {id(func):#x}>"
+    linecache.cache[filename] = (len(formatted), None, formatted.splitlines(True), filename)
+    namespace = dict()
+    exec(compile(formatted, filename, "exec"), namespace)
+    specialized = wraps(func, updated=())(
+        namespace["__make_wrapper"](cache.get, _MISSING, type, Wrapped, wrapper, sys.modules[__name__])
+    )
+    _module_codes[id(specialized.__code__)] = specialized.__code__
+    return specialized
 
 @overload
-def recursive_cache(*, hashify: HashifyType = hashify, unhashify: UnhashifyType = unhashify) -> Callable[[TypedCallable], TypedCallable]: ...
+def recursive_cache(*, hashify: HashifyType = hashify, unhashify: UnhashifyType = unhashify, simple: bool = False) -> Callable[[TypedCallable], TypedCallable]: ...
 @overload
-def recursive_cache(func: TypedCallable, *, hashify: HashifyType = hashify, unhashify: UnhashifyType = unhashify) -> TypedCallable: ...
-def recursive_cache(*args, hashify = hashify, unhashify = unhashify):
+def recursive_cache(func: TypedCallable, *, hashify: HashifyType = hashify, unhashify: UnhashifyType = unhashify, simple: bool = False) -> TypedCallable: ...
+def recursive_cache(*args, hashify = hashify, unhashify = unhashify, simple = False):
     """
     Caches a function to avoid repeating completed function calls and handles
     recursive functions which require more calls than the call stack limit.
 
     Check help(hashify) to view the caching behavior.
 
-    If the call stack limit is reached, function calls are cleared and the
-    latest unfinished function call is re-called and cached if finished.
+    Custom hashify and unhashify functions are called as hashify(obj, cache, key)
+    and unhashify(cache[key], cache, key). The defaults store anything that needs
+    unhashing as Wrapped(unhash, value) and anything else as it is, so a custom
+    hashify paired with the default unhashify must use Wrapped for anything that
+    needs unhashing, and a custom unhashify paired with the default hashify must
+    handle both. Note that older versions stored everything as (unhash, value).
+
+    If the call stack gets close to the limit, function calls are cleared and
+    the latest unfinished function call is re-called and cached if finished.
 
     Takes at most roughly double the amount of function calls to finish.
 
-    Relies on RecursionError to work.
+    Falls back on RecursionError if other calls fill up the call stack.
+
+    If simple=True, completed calls are additionally served by
+    functools.lru_cache, which is much faster for repeated calls.
+    Only use this if results are Hashable and may be shared between
+    calls, since they are no longer copied and iterators are not re-created.
     """
     # Parse overloaded function.
     if len(args) == 0:
-        return lambda func, /: recursive_cache(func, hashify, unhashify)
+        return lambda func, /: recursive_cache(func, hashify=hashify, unhashify=unhashify, simple=simple)
     elif len(args) > 1:
         raise TypeError(f"recursive_cache() takes 0 or 1 positional arguments but {len(args)} were given")
     func = args[0]
     # Already cached function.
-    if any(func == f for f, cache in _func_cache):
+    if id(func) in _func_cache:
         return func
     # Store results in the cache.
-    cache = dict()
-    func_id = len(_func_cache)
-    _func_cache.append((func, cache))
+    cache = {}
+    # Bind the method once instead of looking it up on every call.
+    cache_get = cache.get
+    func_id = id(func)
+    _func_cache[func_id] = (func, cache)
+    # Unwrapped objects may be returned directly by the default unhashify.
+    default_unhashify = unhashify is _unhashify
+    # Common Hashable results may be cached and returned directly by the default hashify and unhashify.
+    default_hashify = default_unhashify and hashify is _hashify
     # Make the wrapper look like the given func.
-    @wraps(func)
+    # The func's __dict__ is not copied, it can be accessed through __wrapped__.
+    @wraps(func, updated=())
     def wrapper(*args: Hashable, **kwargs: Hashable) -> Any:
-        global _base_call
-        # Check if this is a recursive call or not.
-        local_call = _base_call
-        # Future calls must be recursive calls.
-        _base_call = False
         # Break down the args and kwargs into tuple keys.
-        key = (func_id, tuple(args), tuple(kwargs.items()))
+        sub_key = (args, tuple(kwargs.items()) if kwargs else ())
+        # Fast path for finished calls which don't need to be unhashed.
+        # Everything else needs the full path, since exceptions and iterators
+        # are removed from the cache.
+        if default_unhashify:
+            cached = cache_get(sub_key, _MISSING)
+            if cached is not _MISSING and type(cached) is not Wrapped:
+                return cached
+        local = _local
+        temp_cache = local.temp_cache
+        temp_stack = local.temp_stack
+        # Check if this is a recursive call or not.
+        local_call = local.base_call
+        key = (func_id, *sub_key)
         # Already running current call means infinite recursion.
-        if key in _temp_cache:
+        if key in temp_cache:
             raise RecursionError("infinite recursion")
-        # Store current call if we haven't computed it before.
-        if key[1:] not in cache:
-            _temp_cache[key] = None
-        # Base call loop:
-        # Re-calls the last call to continue making progress
-        # while caching them to avoid recomputing
-        # until every call is in the cache.
-        while local_call and _temp_cache:
-            # Get the last call that needs evaluating.
-            temp_key = next(reversed(_temp_cache))
-            func_key = temp_key[0]
-            temp_args = temp_key[1:]
-            temp_func, temp_func_cache = _func_cache[func_key]
-            # Attempt the next function call.
-            try:
-                hashify(temp_func(*temp_args[0], **dict(temp_args[1])), temp_func_cache, temp_args)
-            # If too many calls occur, reset the stack.
-            except RecursionError as e:
-                # If infinite recursion, stop.
-                if str(e) == "infinite recursion":
-                    _base_call = True
-                    _temp_cache.clear()
-                    raise e
-                # If we make no further progress, stop.
-                elif temp_key == next(reversed(_temp_cache)):
-                    _base_call = True
-                    _temp_cache.clear()
-                    raise RecursionError("recursion blocked by other functions") from e
-            # If an exception occurs, store it for re-raising and remove the call from the stack.
-            except Exception as e:
-                hashify(e, temp_func_cache, temp_args)
-                del _temp_cache[temp_key]
-            # If no exceptions occur, the temp_key succeeded and can be removed.
-            else:
-                del _temp_cache[temp_key]
+        # Limit the recursion to part of the call stack.
+        # Each level of recursion uses 3 frames if the wrapper is specialized:
+        # the specialized wrapper, the general wrapper, and the func,
+        # or 2 frames otherwise. Dividing by 4 leaves room for at least
+        # a quarter of the call stack for frames below the base call and
+        # extra frames between calls. The frames below the base call are
+        # not counted, so the limit is halved whenever the recursion limit
+        # is reached before it.
+        if local_call:
+            local.max_depth = sys.getrecursionlimit() // 4
+        # Future calls must be recursive calls.
+        local.base_call = False
+        try:
+            # Store current call if we haven't computed it before.
+            if sub_key not in cache:
+                temp_cache[key] = kwargs or None
+                temp_stack.append(key)
+            # Base call loop:
+            # Re-calls the last call to continue making progress
+            # while caching them to avoid recomputing
+            # until every call is in the cache.
+            while local_call and temp_cache:
+                # Get the last call that needs evaluating.
+                temp_key = temp_stack[-1]
+                func_key = temp_key[0]
+                temp_args = temp_key[1:]
+                temp_func, temp_func_cache = _func_cache[func_key]
+                # Attempt the next function call.
+                try:
+                    hashify(temp_func(*temp_args[0], **(temp_cache[temp_key] or {})), temp_func_cache, temp_args)
+                # If the stack was unwound before the recursion limit, continue from the latest call.
+                # Don't keep the frames it was raised through.
+                except _UnwindToTrampoline as e:
+                    e.__traceback__ = e.__context__ = None
+                # If too many calls occur, reset the stack.
+                except RecursionError as e:
+                    # If infinite recursion, stop.
+                    if str(e) == "infinite recursion":
+                        raise e
+                    # If we make no further progress, stop.
+                    elif temp_key == temp_stack[-1]:
+                        raise RecursionError("recursion blocked by other functions") from e
+                    # Otherwise unwind sooner to avoid reaching the recursion limit again.
+                    # The base call itself is always allowed.
+                    else:
+                        local.max_depth = max(local.max_depth // 2, 1)
+                # If an exception occurs, store it for re-raising and remove the call from the stack.
+                # The frames of the call are cleared since their local variables are no longer needed.
+                except Exception as e:
+                    hashify(clear_frames(e), temp_func_cache, temp_args)
+                    local.temp_remove(temp_key)
+                # If no exceptions occur, the temp_key succeeded and can be removed.
+                else:
+                    local.temp_remove(temp_key)
+        # Reset the state if the base call is interrupted,
+        # for example if the recursion limit is reached while handling another exception,
+        # otherwise later base calls would be treated as recursive calls.
+        # The state is cleared directly since there may be no room left for another frame.
+        except BaseException:
+            if local_call:
+                local.base_call = True
+                temp_cache.clear()
+                temp_stack.clear()
+            raise
+        local.depth += 1
         try:
             # If the key is already in the cache, unhash it.
-            if key[1:] in cache:
-                result = unhashify(cache[key[1:]], cache, key[1:])
+            if sub_key in cache:
+                result = unhashify(cache[sub_key], cache, sub_key)
+            # If the stack is getting too deep, unwind back to the base call,
+            # which continues from the current call.
+            elif local.depth > local.max_depth:
+                raise local.unwind
             # Otherwise compute it.
             else:
-                result = unhashify(hashify(func(*args, **kwargs), cache, key[1:]), cache, key[1:])
+                result = func(*args, **kwargs)
+                if default_hashify and type(result) in _FAST_HASHABLE:
+                    cache[sub_key] = result
+                else:
+                    result = unhashify(hashify(result, cache, sub_key), cache, sub_key)
+        # The stack should never be unwound past the base call,
+        # for example if a custom hashify did not store the result.
+        # Reset the state and fall back on RecursionError instead.
+        except _UnwindToTrampoline as e:
+            if not local_call:
+                raise
+            e.__traceback__ = e.__context__ = None
+            local.temp_clear()
+            raise RecursionError("maximum recursion depth exceeded") from None
         # Don't do anything to RecursionError.
         except RecursionError as e:
             raise e
@@ -310,8 +575,8 @@ def recursive_cache(*args, hashify = hashify, unhashify = unhashify):
         # For example, they may be caught later.
         # Remove it from the cache and re-raise the exception.
         except Exception as e:
-            if key in _temp_cache:
-                del _temp_cache[key]
+            if key in temp_cache:
+                local.temp_remove(key)
             # On the last raise before exiting the wrapper,
             # if toggled (which is by default),
             # then strip the traceback of anything from this module
@@ -329,10 +594,38 @@ def recursive_cache(*args, hashify = hashify, unhashify = unhashify):
         # The result is properly finished.
         # Remove it from the cache and return the result.
         else:
-            if key in _temp_cache:
-                del _temp_cache[key]
+            if key in temp_cache:
+                local.temp_remove(key)
             return result
-        # Ensure the base call gets reset.
+        # Ensure the base call and depth get reset.
         finally:
-            _base_call = local_call
+            local.depth -= 1
+            local.base_call = local_call
+    # Avoid packing *args and **kwargs for finished calls if possible.
+    if default_unhashify:
+        wrapper = specialize_wrapper(func, cache, wrapper)
+    # Serve completed calls directly from the C implemented cache.
+    if simple:
+        return lru_cache(maxsize=None)(wrapper)
     return wrapper
+
+def module_codes(obj: Any) -> Iterator[CodeType]:
+    """Loops through the code objects of functions and nested functions in the given object."""
+    if isinstance(obj, type):
+        for attr in vars(obj).values():
+            yield from module_codes(attr)
+    elif isinstance(obj, FunctionType):
+        yield from module_codes(obj.__code__)
+    elif isinstance(obj, CodeType):
+        yield obj
+        for const in obj.co_consts:
+            yield from module_codes(const)
+
+# Store every code object defined in this module by id, used to strip the traceback.
+# Generated wrappers are added when they are created.
+_module_codes = {
+    id(code): code
+    for obj in list(globals().values())
+    if getattr(obj, "__module__", None) == __name__
+    for code in module_codes(obj)
+}